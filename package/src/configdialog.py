@@ -16,7 +16,8 @@ from com.sun.star.beans import PropertyValue
 
 FOLDER_ICON = "private:graphicrepository/cmd/lc_open.png"
 MAIN_NODE = "ortools.Settings/EngineOptions"
-LIST_ENGINES = ["CBC", "CP-SAT", "GLOP", "SCIP"]
+# "Auto" chooses the engine for each model (see engine_selector.py)
+LIST_ENGINES = ["Auto", "CBC", "CP-SAT", "GLOP", "SCIP"]
 
 # Listener for all buttons in the dialog
 class ActionListener(unohelper.Base, XActionListener):
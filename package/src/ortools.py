@@ -2,11 +2,16 @@
 # This file implements the solver component
 ###############################################
 
+import os
 import sys
 import unohelper
 import uno
 import time
 
+# Shared with the headless tools (located in the pythonpath folder beside this component)
+import linear_model
+import engine_selector
+
 from com.sun.star.sheet import XSolver, XSolverDescription
 from com.sun.star.beans import XPropertySet, XPropertySetInfo, Property, PropertyValue
 from com.sun.star.lang import XServiceInfo
@@ -22,21 +27,18 @@ implementation_service = "org.libreoffice.comp.ORToolsLinear_Impl"
 ortools_properties = {"NonNegative": "Assume variables as non-negative",
                       "Integer": "Assume variables as integer",
                       "Timeout": "Solving time limit (seconds)",
-                      "RelativeGap": "Relative gap for optimality"}
+                      "RelativeGap": "Relative gap for optimality",
+                      "ExportModel": "Export model to MPS and proto files"}
 
 uno_bool_type = uno.getTypeByName("boolean")
 uno_long_type = uno.getTypeByName("long")
 uno_double_type = uno.getTypeByName("double")
 
-CONSTR_BINARY = uno.Enum("com.sun.star.sheet.SolverConstraintOperator", "BINARY")
-CONSTR_INTEGER = uno.Enum("com.sun.star.sheet.SolverConstraintOperator", "INTEGER")
-CONSTR_EQUAL = uno.Enum("com.sun.star.sheet.SolverConstraintOperator", "EQUAL")
-CONSTR_LESS_EQUAL = uno.Enum("com.sun.star.sheet.SolverConstraintOperator", "LESS_EQUAL")
-CONSTR_GREATER_EQUAL = uno.Enum("com.sun.star.sheet.SolverConstraintOperator", "GREATER_EQUAL")
-CELLTYPE_VALUE = uno.Enum("com.sun.star.table.CellContentType", "VALUE")
-CELLTYPE_FORMULA = uno.Enum("com.sun.star.table.CellContentType", "FORMULA")
-
 MAIN_NODE = "ortools.Settings/EngineOptions"
+# Solve times used by the automatic engine selection (stored in the user profile)
+HISTORY_FILE = "ortools_engine_history.json"
+# Default folder for exported models (inside the user profile)
+EXPORT_FOLDER = "ortools_models"
 
 class PropertySetInfo(unohelper.Base, XPropertySetInfo):
 
@@ -91,6 +93,7 @@ class ORToolsSolver(unohelper.Base,
         self.StatusDescription = ""
         self.ortools_path = ""
         self.ortools_engine = ""
+        self.export_path = ""
         # Set-up engine
         self.setup_ortools()
         # Engine properties
@@ -98,11 +101,13 @@ class ORToolsSolver(unohelper.Base,
         self.Integer = False
         self.Timeout = 100
         self.RelativeGap = 0.01 # 1%
+        self.ExportModel = False
         # Used for XPropertySetInfo
         self.ortools_prop_info = (("NonNegative", -1, uno_bool_type, 0),
                                   ("Integer", -1, uno_bool_type, 0),
                                   ("Timeout", -1, uno_long_type, 0),
-                                  ("RelativeGap", -1, uno_double_type, 0))
+                                  ("RelativeGap", -1, uno_double_type, 0),
+                                  ("ExportModel", -1, uno_bool_type, 0))
 
     # Read regisry configuration and attempt to import ortools
     def setup_ortools(self):
@@ -113,6 +118,7 @@ class ORToolsSolver(unohelper.Base,
         self.config_access = cp.createInstanceWithArguments("com.sun.star.configuration.ConfigurationAccess", (node,))
         self.ortools_engine = self.config_access.CurrentEngine
         self.ortools_path = self.config_access.Path
+        self.export_path = self.config_access.ExportPath
         # Check if import works with the provided path
         try:
             if self.ortools_path != "":
@@ -123,6 +129,34 @@ class ORToolsSolver(unohelper.Base,
             self.StatusDescription = "Error importing OR-Tools module"
 
 
+    # Returns the path of the user profile folder
+    def get_user_path(self):
+        smgr = self.ctx.getServiceManager()
+        path_subst = smgr.createInstanceWithContext("com.sun.star.util.PathSubstitution", self.ctx)
+        user_url = path_subst.substituteVariables("$(user)", True)
+        return uno.fileUrlToSystemPath(user_url)
+
+    # Returns the path of the engine history file inside the user profile
+    def get_history_path(self):
+        return os.path.join(self.get_user_path(), HISTORY_FILE)
+
+    # Writes the model and the engine parameters to the export folder
+    # Files are named after the document and the current time (a suffix keeps earlier dumps)
+    def export_model(self, model, engine):
+        folder = self.export_path
+        if folder == "":
+            folder = os.path.join(self.get_user_path(), EXPORT_FOLDER)
+        os.makedirs(folder, exist_ok=True)
+        doc_name = "Untitled"
+        doc_url = self.Document.getURL()
+        if doc_url.startswith("file:"):
+            doc_name = os.path.splitext(os.path.basename(uno.fileUrlToSystemPath(doc_url)))[0]
+        path_base = os.path.join(folder, doc_name + "_" + time.strftime("%Y%m%d_%H%M%S"))
+        path_base = linear_model.unique_path_base(path_base)
+        files = linear_model.export_model(model, path_base, engine, self.NonNegative,
+                                          self.Timeout, self.RelativeGap, doc_name)
+        print("Model exported to:", ", ".join(files))
+
     # Return the value at a given cell
     # Argument is a CellAddress struct
     def get_value(self, cell_address):
@@ -150,6 +184,10 @@ class ORToolsSolver(unohelper.Base,
     def get_tuple(self, cell_address):
         return (cell_address.Sheet, cell_address.Row, cell_address.Column)
 
+    # Returns True if the constraint side is a cell (otherwise it is a numeric value)
+    def is_cell(self, value):
+        return isinstance(value, CellAddress)
+
     # XSolver
     def setDocument(self, aDoc):
         self.Document = aDoc
@@ -199,219 +237,63 @@ class ORToolsSolver(unohelper.Base,
             self.Success = False
             self.ResultValue = 0
             return
-        else:
-            from ortools.linear_solver import pywraplp
 
         # Lock updating the UI
         self.Document.addActionLock()
         self.Document.lockControllers()
 
-        print("Selected engine:", self.ortools_engine)
-        t_ini = time.time()
-        print("Inferring linear model from sheet... ", end='')
-
-        # Set all variable cells to zero
-        for cell in self.Variables:
-            self.set_value(cell, 0)
-
-        # Dictionary containing the variable types
-        # Innitially they are all floats or integers (this may change later while processing constraints)
-        default_var_type = "float"
-        if self.Integer:
-            default_var_type = "integer"
-        dic_var_types = dict()
-        # This list has all the tuples in the same order as in self.Variables
-        list_var_tuples = list()
-        for cell in self.Variables:
-            cell_tuple = self.get_tuple(cell)
-            dic_var_types[cell_tuple] = default_var_type
-            list_var_tuples.append(cell_tuple)
-
-        # Extract the coefficients of the objective function
-        obj_coefficients = list()
-        for cell in self.Variables:
-            # Get current value of the objective function
-            obj_0 = self.get_value(self.Objective)
-            # Increase the value of the cell to 1 and check the new objective value
-            self.set_value(cell, 1)
-            obj_1 = self.get_value(self.Objective)
-            obj_coefficients.append(obj_1 - obj_0)
-            # Restore cell value to zero
-            self.set_value(cell, 0)
-
-        # Extract the coefficients of all constraints / variable types
-        constr_coefficients = list()
-        for constraint in self.Constraints:
-            # Constraints of type "boolean" or "integer" don't generate coefficients
-            # They rather update the variable type
-            c_type = constraint.Operator
-            cell_tuple = self.get_tuple(constraint.Left)
-            if c_type == CONSTR_BINARY:
-                if cell_tuple in dic_var_types:
-                    dic_var_types[cell_tuple] = "binary"
-                    continue
-            if c_type == CONSTR_INTEGER:
-                if cell_tuple in dic_var_types:
-                    dic_var_types[cell_tuple] = "integer"
-                    continue
-            # If it reaches here, then we need to extract coefficients
-            coeff_line = list()
-            # The left side must be a CellAddress
-            left_0 = self.get_value(constraint.Left)
-            # The right side may be a CellAddress or a double value
-            right_0 = 0
-            if isinstance(constraint.Right, CellAddress):
-                right_0 = self.get_value(constraint.Right)
-            # Check if right_1 is different than right_0 at least once
-            # If so, then the right value is a constant, even when it is a CellAddress
-            is_right_constant = True
-            for cell in self.Variables:
-                self.set_value(cell, 1)
-                left_1 = self.get_value(constraint.Left)
-                right_1 = 0
-                if isinstance(constraint.Right, CellAddress):
-                    right_1 = self.get_value(constraint.Right)
-                # Calculate the coefficient
-                if right_1 != right_0:
-                    is_right_constant = False
-                coeff = (left_1 - left_0) - (right_1 - right_0)
-                coeff_line.append(coeff)
-                # Restore original value
-                self.set_value(cell, 0)
-            # The last coefficient is the upper limit to the constraint
-            if is_right_constant:
-                if isinstance(constraint.Right, CellAddress):
-                    coeff_line.append(self.get_value(constraint.Right))
-                elif isinstance(constraint.Right, float):
-                    coeff_line.append(constraint.Right)
-                else:
-                    self.StatusDescription = "Error: unknown constraint type"
-                    self.Success = False
-                    self.ResultValue = 0
-                    return
-            else:
-                # If right side is a variable value, then both sides must be equal and the rhs is zero
-                coeff_line.append(0)
-            # Add the coefficients of the constraint
-            constr_coefficients.append(coeff_line)
-
-        # Create the solver object (possible values are GLOP, CLP, CBC, GLPK, SCIP)
-        t_end = time.time()
-        print(f"Done ({t_end - t_ini} seconds)")
-        t_ini = time.time()
-        print("Setting up solver object... ", end='')
-        # Create the solver using the selected engine (as defined in the settings dialog)
-        solver = pywraplp.Solver.CreateSolver(self.ortools_engine)
-
-        # Check if the solver engine could be instantiated
-        if solver is None:
-            self.StatusDescription = "Error: unable to instantiate the solver engine"
-            self.Success = False
-            self.ResultValue = 0
-            return
-
-        # Lower and upper bounds for variables
-        min_value = -solver.infinity()
-        if self.NonNegative:
-            min_value = 0
-        max_value = solver.infinity()
-
-        # Create the solver variables
-        model_vars = dict()
-        for cell in self.Variables:
-            cell_tuple = self.get_tuple(cell)
-            var_type = dic_var_types[cell_tuple]
-            if var_type == "float":
-                model_vars[cell_tuple] = solver.NumVar(min_value, max_value, str(cell_tuple))
-            elif var_type == "integer":
-                model_vars[cell_tuple] = solver.IntVar(min_value, max_value, str(cell_tuple))
-            elif var_type == "binary":
-                model_vars[cell_tuple] = solver.IntVar(0, 1, str(cell_tuple))
-            else:
-                self.StatusDescription = "Error: undefined variable type"
-                self.Success = False
-                self.ResultValue = 0
-                return
-
-        # Set coefficients of the objective function
-        obj_function = solver.Objective()
-        for i in range(len(self.Variables)):
-            cell_tuple = list_var_tuples[i]
-            obj_function.SetCoefficient(model_vars[cell_tuple], obj_coefficients[i])
-
-        # Set objective type
-        if self.Maximize:
-            obj_function.SetMaximization()
-        else:
-            obj_function.SetMinimization()
-
-        # Set coefficients of all constraints
-        constr_idx = 0
-        n_vars = len(self.Variables)
-        for constraint in self.Constraints:
-            c_type = constraint.Operator
-            # Only add constraint if it has left and right sides
-            if c_type != CONSTR_BINARY and c_type != CONSTR_INTEGER:
-                # The RHS (right hand side) of the constraint is the last coefficient
-                new_constr = None
-                if c_type == CONSTR_EQUAL:
-                    new_constr = solver.RowConstraint(constr_coefficients[constr_idx][n_vars], constr_coefficients[constr_idx][n_vars], "")
-                elif c_type == CONSTR_LESS_EQUAL:
-                    new_constr = solver.RowConstraint(0, constr_coefficients[constr_idx][n_vars], "")
-                elif c_type == CONSTR_GREATER_EQUAL:
-                    new_constr = solver.RowConstraint(constr_coefficients[constr_idx][n_vars], solver.infinity(), "")
-                else:
-                    self.StatusDescription = "Error: unknown constraint type"
-                    self.Success = False
-                    self.ResultValue = 0
-                    return
-                # Now set the coefficients of the new constraint
-                for j in range(n_vars):
-                    cell_tuple = list_var_tuples[j]
-                    new_constr.SetCoefficient(model_vars[cell_tuple], constr_coefficients[constr_idx][j])
-                constr_idx += 1
-
-        # Set solver parameters
-        solverParams = pywraplp.MPSolverParameters()
-        solverParams.SetDoubleParam(solverParams.RELATIVE_MIP_GAP, self.RelativeGap)
-        solver.SetTimeLimit(self.Timeout * 1000)
-
-        # Finished setting up solver object
-        t_end = time.time()
-        print(f"Done ({t_end - t_ini} seconds)")
-
-        # Call the solver
-        t_ini = time.time()
-        print("Running the solver... ", end='')
-        status = solver.Solve()
-        t_end = time.time()
-        print(f"Done ({t_end - t_ini} seconds)")
-        print("----------------------------\n")
-
-        # Records the success status
-        if status == pywraplp.Solver.OPTIMAL:
-            self.Success = True
-            self.ResultValue = solver.Objective().Value()
-            self.StatusDescription = "Optimal solution found"
-        elif status == pywraplp.Solver.FEASIBLE:
-            self.Success = True
-            self.ResultValue = solver.Objective().Value()
-            self.StatusDescription = "Sub-optimal feasible solution found"
-        else:
+        try:
+            print("Selected engine:", self.ortools_engine)
+            t_ini = time.time()
+            print("Inferring linear model from sheet... ", end='')
+            # Operators are passed by name (e.g. "LESS_EQUAL") so that the model does not depend on UNO
+            constraints = [(c.Left, c.Operator.value, c.Right) for c in self.Constraints]
+            model = linear_model.extract_model(self, self.Objective, self.Variables, constraints,
+                                               self.Integer, self.Maximize)
+            t_end = time.time()
+            print(f"Done ({t_end - t_ini} seconds)")
+
+            # Choose the engine from the model statistics and previous solve times
+            engine = self.ortools_engine
+            if engine == engine_selector.ENGINE_AUTO:
+                history = engine_selector.EngineHistory(self.get_history_path())
+                engine, reason = engine_selector.select_engine(model, history)
+                print(f"Automatic engine selection: {engine} ({reason})")
+
+            # Export errors should not prevent the model from being solved
+            if self.ExportModel:
+                try:
+                    self.export_model(model, engine)
+                except linear_model.ModelError:
+                    raise
+                except Exception as e:
+                    print("Unable to export the model:", e)
+
+            result = linear_model.solve_model(model, engine, self.NonNegative,
+                                              self.Timeout, self.RelativeGap)
+            print("----------------------------\n")
+
+            # Records the success status and the solution
+            self.Success = result.success
+            self.ResultValue = result.result_value
+            self.StatusDescription = result.status_description
+            self.Solution = result.solution
+
+            if self.ortools_engine == engine_selector.ENGINE_AUTO:
+                self.StatusDescription += f" (engine: {engine}; {reason})"
+                history.record(engine_selector.fingerprint(model), engine, result.solve_seconds, result.success)
+                try:
+                    history.save()
+                except OSError:
+                    print("Unable to save the engine history")
+        except linear_model.ModelError as e:
+            self.StatusDescription = str(e)
             self.Success = False
             self.ResultValue = 0
-            self.StatusDescription = "No solution found"
-
-        # Records the solution
-        solution = list()
-        for cell_tuple in list_var_tuples:
-            var_value = model_vars[cell_tuple].solution_value()
-            solution.append(var_value)
-        self.Solution = solution
-
-        # Resume updating the UI
-        self.Document.unlockControllers()
-        self.Document.removeActionLock()
+        finally:
+            # Resume updating the UI
+            self.Document.unlockControllers()
+            self.Document.removeActionLock()
 
 
     # XSolverDescription
@@ -446,6 +328,9 @@ class ORToolsSolver(unohelper.Base,
             if isinstance(aPropValue, float):
                 if aPropValue > 0 and aPropValue < 1:
                     self.RelativeGap = aPropValue
+        elif aPropName == "ExportModel":
+            if isinstance(aPropValue, bool):
+                self.ExportModel = aPropValue
         else:
             raise UnknownPropertyException("Unknown property: " + aPropName, self)
 
@@ -458,6 +343,8 @@ class ORToolsSolver(unohelper.Base,
             return self.Timeout
         elif aPropName == "RelativeGap":
             return self.RelativeGap
+        elif aPropName == "ExportModel":
+            return self.ExportModel
         raise UnknownPropertyException("Unknown property: " + aPropName, self)
 
     # Leave these listeners blank for now; need to check how to implement them
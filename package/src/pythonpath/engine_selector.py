@@ -0,0 +1,172 @@
+###############################################
+# This file implements the automatic selection of the solver engine
+# (it must not depend on UNO)
+###############################################
+
+import hashlib
+import json
+import math
+import os
+
+import linear_model
+
+# Name of the engine option that enables the automatic selection
+ENGINE_AUTO = "Auto"
+
+# Engines considered for each kind of model (the first one is the default choice)
+LP_ENGINES = ["GLOP", "CBC", "SCIP"]
+BINARY_ENGINES = ["CP-SAT", "SCIP", "CBC"]
+MIP_ENGINES = ["SCIP", "CBC", "CP-SAT"]
+SMALL_MIP_ENGINES = ["CBC", "SCIP", "CP-SAT"]
+
+# Mixed integer models up to this size are solved with CBC, whose start-up cost is lower than SCIP's
+SMALL_MIP_VARS = 200
+
+# Share of binary variables from which CP-SAT is preferred for pure integer models
+BINARY_SHARE = 0.5
+
+# If the fastest engine in the history takes longer than this (seconds),
+# engines never tried for the model are tried before settling on it
+EXPLORE_SECONDS = 1.0
+
+# Number of solve times kept per model and engine
+HISTORY_SIZE = 10
+
+
+# Returns True for finite integer values (cells may hold inf or NaN after overflows or divisions by zero)
+def is_integral(value):
+    return math.isfinite(value) and float(value).is_integer()
+
+
+# Statistics of a linear model used to choose the engine
+class ModelStats:
+
+    def __init__(self, model):
+        self.n_vars = len(model.var_names)
+        self.n_constraints = len(model.constraints)
+        self.n_continuous = model.var_types.count(linear_model.VAR_FLOAT)
+        self.n_integer = model.var_types.count(linear_model.VAR_INTEGER)
+        self.n_binary = model.var_types.count(linear_model.VAR_BINARY)
+        # Count the non-zero constraint coefficients and check if all coefficients are integer
+        self.nonzeros = 0
+        self.integral_coefficients = all(is_integral(coeff) for coeff in model.obj_coefficients)
+        for _, coeffs, rhs in model.constraints:
+            if not is_integral(rhs):
+                self.integral_coefficients = False
+            for coeff in coeffs:
+                if coeff != 0:
+                    self.nonzeros += 1
+                    if not is_integral(coeff):
+                        self.integral_coefficients = False
+        self.density = 0.0
+        if self.n_vars > 0 and self.n_constraints > 0:
+            self.density = self.nonzeros / (self.n_vars * self.n_constraints)
+
+    def binary_share(self):
+        if self.n_vars == 0:
+            return 0.0
+        return self.n_binary / self.n_vars
+
+    def describe(self):
+        return (f"{self.n_vars} variables ({self.n_continuous} continuous, {self.n_integer} integer, "
+                f"{self.n_binary} binary), {self.n_constraints} constraints, density {self.density:.1%}")
+
+
+# Returns a fingerprint of the model structure
+# Models built from the same workbook layout share the fingerprint even when the data changes
+def fingerprint(model):
+    digest = hashlib.sha1()
+    digest.update(",".join(model.var_types).encode())
+    digest.update(b"max" if model.maximize else b"min")
+    for operator, coeffs, _ in model.constraints:
+        pattern = "".join("1" if coeff != 0 else "0" for coeff in coeffs)
+        digest.update(f"{operator}:{pattern};".encode())
+    return digest.hexdigest()
+
+
+# Local history of solve times per model fingerprint and engine
+class EngineHistory:
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = dict()
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            # Missing or corrupted history files are treated as empty
+            self.entries = dict()
+
+    def record(self, model_fingerprint, engine, seconds, success):
+        times = self.entries.setdefault(model_fingerprint, dict()).setdefault(engine, list())
+        # Failed runs are recorded with no time so that they are not taken as fast runs
+        times.append(seconds if success else None)
+        del times[:-HISTORY_SIZE]
+
+    # Returns the mean solve time of the successful runs (None if the engine never succeeded)
+    def mean_time(self, model_fingerprint, engine):
+        times = self.entries.get(model_fingerprint, dict()).get(engine, list())
+        times = [t for t in times if t is not None]
+        if not times:
+            return None
+        return sum(times) / len(times)
+
+    def tried(self, model_fingerprint, engine):
+        return engine in self.entries.get(model_fingerprint, dict())
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f)
+
+
+# Returns True if the engine can be instantiated by the installed OR-Tools
+def engine_available(engine):
+    from ortools.linear_solver import pywraplp
+    return pywraplp.Solver.CreateSolver(engine) is not None
+
+
+# Chooses the engine for a model
+# Returns the engine name and a short description of the reason for the choice
+def select_engine(model, history=None, available=engine_available):
+    stats = ModelStats(model)
+    if stats.n_integer == 0 and stats.n_binary == 0:
+        candidates = LP_ENGINES
+        reason = "linear model"
+    elif stats.n_continuous == 0 and stats.integral_coefficients and stats.binary_share() >= BINARY_SHARE:
+        candidates = BINARY_ENGINES
+        reason = "pure integer model with mostly binary variables"
+    elif stats.n_vars <= SMALL_MIP_VARS:
+        candidates = SMALL_MIP_ENGINES
+        reason = "small mixed integer model"
+    else:
+        candidates = MIP_ENGINES
+        reason = "mixed integer model"
+    candidates = [engine for engine in candidates if available(engine)]
+    if not candidates:
+        raise linear_model.ModelError("Error: unable to instantiate the solver engine")
+    engine = candidates[0]
+    reason = f"{reason}; {stats.describe()}"
+
+    # Refine the choice using the solve times of previous runs of the same model
+    if history is not None:
+        model_fingerprint = fingerprint(model)
+        measured = [(history.mean_time(model_fingerprint, c), c) for c in candidates
+                    if history.mean_time(model_fingerprint, c) is not None]
+        untried = [c for c in candidates if not history.tried(model_fingerprint, c)]
+        if measured:
+            best_time, best_engine = min(measured)
+            if best_time > EXPLORE_SECONDS and untried:
+                engine = untried[0]
+                reason = f"{reason}; trying {engine} since {best_engine} took {best_time:.2f} s"
+            else:
+                engine = best_engine
+                reason = f"{reason}; fastest in history ({best_time:.2f} s)"
+        elif untried and untried != candidates:
+            # All engines tried so far failed for this model
+            engine = untried[0]
+            reason = f"{reason}; previous engines failed"
+
+    return engine, reason
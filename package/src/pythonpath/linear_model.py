@@ -0,0 +1,281 @@
+###############################################
+# This file implements the linear model shared by the solver component
+# and the headless tools (it must not depend on UNO)
+###############################################
+
+import json
+import os
+import time
+
+# Variable types
+VAR_FLOAT = "float"
+VAR_INTEGER = "integer"
+VAR_BINARY = "binary"
+
+# Constraint operators (same names as com.sun.star.sheet.SolverConstraintOperator)
+OP_BINARY = "BINARY"
+OP_INTEGER = "INTEGER"
+OP_EQUAL = "EQUAL"
+OP_LESS_EQUAL = "LESS_EQUAL"
+OP_GREATER_EQUAL = "GREATER_EQUAL"
+
+
+# Raised when the model cannot be extracted or set up
+# The message is meant to be used as the status description
+class ModelError(Exception):
+    pass
+
+
+# Linear model inferred from the sheet
+class LinearModel:
+
+    def __init__(self, var_names, default_var_type=VAR_FLOAT, maximize=True):
+        # Variable names are the tuples (Sheet, Row, Column) of the variable cells
+        self.var_names = list(var_names)
+        self.var_types = [default_var_type] * len(self.var_names)
+        self.obj_coefficients = [0] * len(self.var_names)
+        self.maximize = maximize
+        # Each constraint is a tuple (operator, coefficients, rhs)
+        self.constraints = list()
+
+    def add_constraint(self, operator, coefficients, rhs):
+        self.constraints.append((operator, coefficients, rhs))
+
+
+# Result of solving a linear model
+class SolveResult:
+
+    def __init__(self):
+        self.success = False
+        self.result_value = 0
+        self.status_description = ""
+        self.solution = list()
+        self.solve_seconds = 0
+
+
+# Returns a variable name that is valid in MPS files (e.g. "S0_R1_C2" for the cell tuple (0, 1, 2))
+def var_label(name):
+    if isinstance(name, tuple):
+        return "S%d_R%d_C%d" % name
+    return str(name)
+
+
+# Infer the linear model by setting each variable to 1 and checking how the
+# objective and the constraints change
+# The cell source must implement get_value, set_value, get_tuple and is_cell
+# Constraints are given as tuples (left, operator, right) where right is either a cell or a number
+def extract_model(source, objective, variables, constraints, integer=False, maximize=True):
+    # Set all variable cells to zero
+    for cell in variables:
+        source.set_value(cell, 0)
+
+    # Innitially all variables are floats or integers (this may change later while processing constraints)
+    default_var_type = VAR_FLOAT
+    if integer:
+        default_var_type = VAR_INTEGER
+    var_names = [source.get_tuple(cell) for cell in variables]
+    model = LinearModel(var_names, default_var_type, maximize)
+    var_index = {name: i for i, name in enumerate(var_names)}
+
+    # Extract the coefficients of the objective function
+    obj_0 = source.get_value(objective)
+    for i, cell in enumerate(variables):
+        # Increase the value of the cell to 1 and check the new objective value
+        source.set_value(cell, 1)
+        obj_1 = source.get_value(objective)
+        model.obj_coefficients[i] = obj_1 - obj_0
+        # Restore cell value to zero
+        source.set_value(cell, 0)
+
+    # Extract the coefficients of all constraints / variable types
+    for left, operator, right in constraints:
+        # Constraints of type "boolean" or "integer" don't generate coefficients
+        # They rather update the variable type
+        # Type constraints on cells that are not variables are ignored
+        cell_tuple = source.get_tuple(left)
+        if operator == OP_BINARY:
+            if cell_tuple in var_index:
+                model.var_types[var_index[cell_tuple]] = VAR_BINARY
+            continue
+        if operator == OP_INTEGER:
+            if cell_tuple in var_index:
+                model.var_types[var_index[cell_tuple]] = VAR_INTEGER
+            continue
+        if operator not in (OP_EQUAL, OP_LESS_EQUAL, OP_GREATER_EQUAL):
+            raise ModelError("Error: unknown constraint type")
+        # The left side must be a cell
+        right_is_cell = source.is_cell(right)
+        left_0 = source.get_value(left)
+        # The right side may be a cell or a numeric value
+        right_0 = 0
+        if right_is_cell:
+            right_0 = source.get_value(right)
+        # Check if right_1 is different than right_0 at least once
+        # If so, then the right value is not a constant, even when it is a cell
+        is_right_constant = True
+        coefficients = list()
+        for cell in variables:
+            source.set_value(cell, 1)
+            left_1 = source.get_value(left)
+            right_1 = 0
+            if right_is_cell:
+                right_1 = source.get_value(right)
+            if right_1 != right_0:
+                is_right_constant = False
+            coefficients.append((left_1 - left_0) - (right_1 - right_0))
+            # Restore original value
+            source.set_value(cell, 0)
+        if is_right_constant:
+            if right_is_cell:
+                rhs = right_0
+            elif isinstance(right, (int, float)):
+                rhs = right
+            else:
+                raise ModelError("Error: unknown constraint type")
+        else:
+            # If right side is a variable value, then both sides must be equal and the rhs is zero
+            rhs = 0
+        model.add_constraint(operator, coefficients, rhs)
+
+    return model
+
+
+# Create the pywraplp solver object for a given model
+# Returns the solver, the list of solver variables and the solver parameters
+def build_solver(model, engine, non_negative=True, timeout=100, relative_gap=0.01):
+    from ortools.linear_solver import pywraplp
+
+    # Create the solver using the selected engine (possible values are GLOP, CLP, CBC, GLPK, SCIP, CP-SAT)
+    solver = pywraplp.Solver.CreateSolver(engine)
+
+    # Check if the solver engine could be instantiated
+    if solver is None:
+        raise ModelError("Error: unable to instantiate the solver engine")
+
+    # Lower and upper bounds for variables
+    min_value = -solver.infinity()
+    if non_negative:
+        min_value = 0
+    max_value = solver.infinity()
+
+    # Create the solver variables
+    model_vars = list()
+    for name, var_type in zip(model.var_names, model.var_types):
+        if var_type == VAR_FLOAT:
+            model_vars.append(solver.NumVar(min_value, max_value, var_label(name)))
+        elif var_type == VAR_INTEGER:
+            model_vars.append(solver.IntVar(min_value, max_value, var_label(name)))
+        elif var_type == VAR_BINARY:
+            model_vars.append(solver.IntVar(0, 1, var_label(name)))
+        else:
+            raise ModelError("Error: undefined variable type")
+
+    # Set coefficients of the objective function
+    obj_function = solver.Objective()
+    for var, coeff in zip(model_vars, model.obj_coefficients):
+        obj_function.SetCoefficient(var, coeff)
+
+    # Set objective type
+    if model.maximize:
+        obj_function.SetMaximization()
+    else:
+        obj_function.SetMinimization()
+
+    # Set coefficients of all constraints
+    for operator, coefficients, rhs in model.constraints:
+        if operator == OP_EQUAL:
+            new_constr = solver.RowConstraint(rhs, rhs, "")
+        elif operator == OP_LESS_EQUAL:
+            new_constr = solver.RowConstraint(0, rhs, "")
+        elif operator == OP_GREATER_EQUAL:
+            new_constr = solver.RowConstraint(rhs, solver.infinity(), "")
+        else:
+            raise ModelError("Error: unknown constraint type")
+        for var, coeff in zip(model_vars, coefficients):
+            new_constr.SetCoefficient(var, coeff)
+
+    # Set solver parameters
+    solver_params = pywraplp.MPSolverParameters()
+    solver_params.SetDoubleParam(solver_params.RELATIVE_MIP_GAP, relative_gap)
+    solver.SetTimeLimit(int(timeout * 1000))
+
+    return solver, model_vars, solver_params
+
+
+# Solve the model with the given engine and engine properties
+def solve_model(model, engine, non_negative=True, timeout=100, relative_gap=0.01, verbose=True):
+    from ortools.linear_solver import pywraplp
+
+    t_ini = time.time()
+    if verbose:
+        print("Setting up solver object... ", end='')
+    solver, model_vars, solver_params = build_solver(model, engine, non_negative, timeout, relative_gap)
+    t_end = time.time()
+    if verbose:
+        print(f"Done ({t_end - t_ini} seconds)")
+
+    # Call the solver
+    t_ini = time.time()
+    if verbose:
+        print("Running the solver... ", end='')
+    status = solver.Solve(solver_params)
+    t_end = time.time()
+    if verbose:
+        print(f"Done ({t_end - t_ini} seconds)")
+
+    # Records the success status
+    result = SolveResult()
+    result.solve_seconds = t_end - t_ini
+    if status == pywraplp.Solver.OPTIMAL:
+        result.success = True
+        result.result_value = solver.Objective().Value()
+        result.status_description = "Optimal solution found"
+    elif status == pywraplp.Solver.FEASIBLE:
+        result.success = True
+        result.result_value = solver.Objective().Value()
+        result.status_description = "Sub-optimal feasible solution found"
+    else:
+        result.success = False
+        result.result_value = 0
+        result.status_description = "No solution found"
+
+    # Records the solution
+    result.solution = [var.solution_value() for var in model_vars]
+    return result
+
+
+# Returns path_base, or path_base with a numeric suffix if files exported there already exist
+def unique_path_base(path_base):
+    candidate = path_base
+    count = 1
+    while any(os.path.exists(candidate + ext) for ext in (".mps", ".pb", ".json")):
+        count += 1
+        candidate = f"{path_base}_{count}"
+    return candidate
+
+
+# Writes the model to "<path_base>.mps" and "<path_base>.pb" (binary MPModelProto)
+# The engine parameters are written to "<path_base>.json" since neither format stores them
+# Returns the list of files written
+def export_model(model, path_base, engine, non_negative=True, timeout=100, relative_gap=0.01, source=""):
+    from ortools.linear_solver import linear_solver_pb2
+
+    solver, _, _ = build_solver(model, engine, non_negative, timeout, relative_gap)
+    proto = linear_solver_pb2.MPModelProto()
+    solver.ExportModelToProto(proto)
+    proto.name = source
+
+    with open(path_base + ".mps", "w") as f:
+        f.write(solver.ExportModelAsMpsFormat(False, False))
+    with open(path_base + ".pb", "wb") as f:
+        f.write(proto.SerializeToString())
+    params = {"source": source,
+              "engine": engine,
+              "non_negative": non_negative,
+              "timeout": timeout,
+              "relative_gap": relative_gap,
+              "variables": [var_label(name) for name in model.var_names],
+              "var_types": model.var_types}
+    with open(path_base + ".json", "w") as f:
+        json.dump(params, f, indent=2)
+    return [path_base + ".mps", path_base + ".pb", path_base + ".json"]
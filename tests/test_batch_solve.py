@@ -0,0 +1,267 @@
+import os
+import sys
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools"))
+import batch_solve
+from batch_solve import Evaluator, FormulaParser, Workbook, WorkbookError
+
+
+HEADER = ('<?xml version="1.0" encoding="UTF-8"?>'
+          '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
+          ' xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"'
+          ' xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0">'
+          '<office:body><office:spreadsheet>')
+FOOTER = '</office:spreadsheet></office:body></office:document-content>'
+
+OPTIONS = {"engine": "CBC", "timeout": 10, "relative_gap": 0.0, "non_negative": True,
+           "integer": False, "history": "", "export": "", "sheet": ""}
+
+
+def write_ods(path, body):
+    with zipfile.ZipFile(path, "w") as package:
+        package.writestr("mimetype", "application/vnd.oasis.opendocument.spreadsheet")
+        package.writestr("content.xml", HEADER + body + FOOTER)
+    return str(path)
+
+
+def value(number, repeat=1):
+    return (f'<table:table-cell table:number-columns-repeated="{repeat}"'
+            f' office:value-type="float" office:value="{number}"/>')
+
+
+# Cells that do not depend on the variables keep the cached value, as saved by LibreOffice
+def formula(text, cached=0):
+    return f'<table:table-cell table:formula="{text}" office:value-type="float" office:value="{cached}"/>'
+
+
+def row(*cells, repeat=1):
+    return f'<table:table-row table:number-rows-repeated="{repeat}">' + "".join(cells) + '</table:table-row>'
+
+
+def names(sheet, **items):
+    result = "<table:named-expressions>"
+    for name, text in items.items():
+        if text.startswith("$"):
+            result += (f'<table:named-range table:name="{name}" table:base-cell-address="${sheet}.$A$1"'
+                       f' table:cell-range-address="{text}"/>')
+        else:
+            result += (f'<table:named-expression table:name="{name}" table:base-cell-address="${sheet}.$A$1"'
+                       f' table:expression="of:={text}"/>')
+    return result + "</table:named-expressions>"
+
+
+def table(name, *rows, local_names=""):
+    return f'<table:table table:name="{name}">' + "".join(rows) + local_names + '</table:table>'
+
+
+def evaluate(text, workbook=None):
+    workbook = workbook or Workbook()
+    if not workbook.sheet_names:
+        workbook.sheet_names.append("Sheet1")
+    return Evaluator(workbook, []).evaluate(FormulaParser(workbook, 0, text).parse())
+
+
+def test_split_sheet():
+    assert batch_solve.split_sheet("$Sheet1.$A$1") == ("Sheet1", "$A$1")
+    assert batch_solve.split_sheet("$'It''s a.sheet'.B2") == ("It's a.sheet", "B2")
+    assert batch_solve.split_sheet(".C3") == (None, "C3")
+    assert batch_solve.split_sheet("D4") == (None, "D4")
+
+
+def test_parse_range():
+    workbook = Workbook()
+    workbook.sheet_names.extend(["First", "My Sheet"])
+    assert workbook.parse_range("$'My Sheet'.$B$2:.$AA$10") == ((1, 1, 1), (1, 9, 26))
+    assert workbook.parse_range(".A1", default_sheet=1) == ((1, 0, 0), (1, 0, 0))
+    with pytest.raises(WorkbookError):
+        workbook.parse_range("$Missing.A1")
+
+
+def test_split_addresses():
+    assert batch_solve.split_addresses("$'My Sheet'.$A$1 [$S.B1:.B2];$S.C3") == \
+        ["$'My Sheet'.$A$1", "$S.B1:.B2", "$S.C3"]
+
+
+def test_operator_precedence():
+    assert evaluate("of:=1+2*3") == 7
+    assert evaluate("of:=(1+2)*3") == 9
+    assert evaluate("of:=2*3^2") == 18
+    assert evaluate("of:=-2^2") == 4
+    assert evaluate("of:=10-4-3") == 3
+    assert evaluate("of:=50%*4") == 2
+    assert evaluate("of:=1+2<4") == 1
+
+
+def test_round_half_away_from_zero():
+    assert evaluate("of:=ROUND(2.5)") == 3
+    assert evaluate("of:=ROUND(-2.5)") == -3
+    assert evaluate("of:=ROUND(1.005;2)") == 1.01
+    assert evaluate("of:=ROUND(1234;-2)") == 1200
+
+
+def test_scalar_functions_reject_ranges():
+    workbook = Workbook()
+    workbook.sheet_names.append("Sheet1")
+    with pytest.raises(WorkbookError):
+        evaluate("of:=ABS([.A1:.A2])", workbook)
+    with pytest.raises(WorkbookError):
+        evaluate("of:=ROUND([.A1:.A2];1)", workbook)
+
+
+def test_repeated_rows_and_columns(tmp_path):
+    path = write_ods(tmp_path / "repeat.ods", table(
+        "Sheet1",
+        row(value(2, repeat=3)),
+        row(value(1), repeat=1500),
+        # Filler blocks without content are skipped
+        row('<table:table-cell table:number-columns-repeated="1024"/>', repeat=1048000)))
+    workbook = batch_solve.read_workbook(path)
+    assert workbook.values[(0, 0, 2)] == 2
+    assert workbook.values[(0, 1500, 0)] == 1
+    assert len(workbook.values) == 1503
+
+
+def test_sheet_local_names(tmp_path):
+    path = write_ods(tmp_path / "local.ods",
+                     table("A", row(value(1)), local_names=names("A", solver_opt="$A.$A$1", price="2")) +
+                     table("B", row(value(1)), local_names=names("B", solver_opt="$B.$A$1")) +
+                     names("A", price="3"))
+    workbook = batch_solve.read_workbook(path)
+    assert batch_solve.model_scopes(workbook) == [0, 1]
+    assert evaluate("of:=price", workbook) == 2
+    assert Evaluator(workbook, []).evaluate(FormulaParser(workbook, 1, "of:=price").parse()) == 3
+    # Solver settings are not taken from another sheet
+    assert batch_solve.named_cells(workbook, "solver_opt", 1) == [(1, 0, 0)]
+    assert batch_solve.named_text(workbook, "price", 1) is None
+
+
+# Maximize 3x + 5y with x + 2y <= 14, 3x + y <= 8.1 and x >= 1, x and y integer
+def production_sheet(name="Plan"):
+    return table(
+        name,
+        row(value(0), value(3)),
+        row(value(0), value(5)),
+        row(formula("of:=SUMPRODUCT([.A1:.A2];[.B1:.B2])")),
+        row(formula("of:=[.A1]+2*[.A2]"), value(14)),
+        row(formula("of:=3*[.A1]+[.A2]"), formula("of:=SUM([.B1:.B2])+10%", cached=8.1)),
+        local_names=names(name,
+                          solver_opt=f"${name}.$A$3",
+                          solver_adj=f"${name}.$A$1:.$A$2",
+                          solver_typ="1",
+                          solver_num="3",
+                          solver_lhs1=f"${name}.$A$4:.$A$5",
+                          solver_rel1="1",
+                          solver_rhs1=f"${name}.$B$4:.$B$5",
+                          solver_lhs2=f"${name}.$A$1:.$A$2",
+                          solver_rel2="4",
+                          solver_lhs3=f"${name}.$A$1",
+                          solver_rel3="3",
+                          solver_rhs3="1"))
+
+
+def test_solve_file(tmp_path):
+    pytest.importorskip("ortools")
+    path = write_ods(tmp_path / "plan.ods", production_sheet())
+    [result] = batch_solve.solve_file(path, OPTIONS)
+    assert result["status"] == "Optimal solution found"
+    assert result["sheet"] == "Plan"
+    assert result["result_value"] == pytest.approx(28)
+    assert result["solution"] == {"Plan.A1": pytest.approx(1), "Plan.A2": pytest.approx(5)}
+
+
+def test_solve_file_with_single_right_cell(tmp_path):
+    pytest.importorskip("ortools")
+    # Maximize A1 + B1 + C1 with every cell of A1:C1 <= D1 (= 2)
+    path = write_ods(tmp_path / "broadcast.ods", table(
+        "S",
+        row(value(0, repeat=3), value(2)),
+        row(formula("of:=SUM([.A1:.C1])")),
+        local_names=names("S", solver_opt="$S.$A$2", solver_adj="$S.$A$1:.$C$1", solver_typ="1",
+                          solver_num="1", solver_lhs1="$S.$A$1:.$C$1", solver_rel1="1",
+                          solver_rhs1="$S.$D$1")))
+    [result] = batch_solve.solve_file(path, OPTIONS)
+    assert result["success"]
+    assert result["result_value"] == pytest.approx(6)
+
+
+def test_solve_file_with_repeated_rows(tmp_path):
+    pytest.importorskip("ortools")
+    # Maximize A1 * SUM(B2:B1501) with A1 <= 2, where B2:B1501 is a block of repeated ones
+    path = write_ods(tmp_path / "repeat.ods", table(
+        "S",
+        row(value(0), formula("of:=[.A1]*SUM([.B2:.B1501])")),
+        row(value(0), value(1), repeat=1500),
+        local_names=names("S", solver_opt="$S.$B$1", solver_adj="$S.$A$1", solver_typ="1",
+                          solver_num="1", solver_lhs1="$S.$A$1", solver_rel1="1", solver_rhs1="2")))
+    [result] = batch_solve.solve_file(path, OPTIONS)
+    assert result["result_value"] == pytest.approx(3000)
+
+
+def test_solve_file_with_several_sheets(tmp_path):
+    pytest.importorskip("ortools")
+    path = write_ods(tmp_path / "two.ods", production_sheet("P1") + production_sheet("P2"))
+    results = batch_solve.solve_file(path, OPTIONS)
+    assert [result["sheet"] for result in results] == ["P1", "P2"]
+    assert all(result["result_value"] == pytest.approx(28) for result in results)
+    options = dict(OPTIONS, sheet="P2")
+    assert [result["sheet"] for result in batch_solve.solve_file(path, options)] == ["P2"]
+
+
+def test_solve_file_errors(tmp_path):
+    bad = tmp_path / "bad.ods"
+    bad.write_text("not a zip")
+    [result] = batch_solve.solve_file(str(bad), OPTIONS)
+    assert result["status"].startswith("Error reading file")
+    empty = write_ods(tmp_path / "empty.ods", table("S", row(value(1))))
+    [result] = batch_solve.solve_file(empty, OPTIONS)
+    assert result["status"] == "No solver model stored in the file"
+
+
+def test_long_dependency_chain(tmp_path):
+    # Running total C(i) = C(i-1) + A(i), much longer than the recursion limit
+    rows = [row(value(1), value(0), formula("of:=[.A1]+[.B1]"))]
+    rows += [row(value(1), value(0), formula(f"of:=[.C{i - 1}]+[.A{i}]")) for i in range(2, 5001)]
+    workbook = batch_solve.read_workbook(write_ods(tmp_path / "chain.ods", table("S", *rows)))
+    evaluator = Evaluator(workbook, [(0, 0, 1)])
+    evaluator.set_value((0, 0, 1), 3)
+    assert evaluator.get_value((0, 4999, 2)) == 5003
+    assert evaluator.depends_on_variables((0, 2500, 2))
+    assert not evaluator.depends_on_variables((0, 2500, 0))
+
+
+def test_circular_references(tmp_path):
+    # A1 and A2 refer to each other and A2 uses the variable B1; A3 is a cycle without variables
+    workbook = batch_solve.read_workbook(write_ods(tmp_path / "cycle.ods", table(
+        "S",
+        row(formula("of:=[.A2]"), value(0)),
+        row(formula("of:=[.A1]+[.B1]")),
+        row(formula("of:=[.A3]", cached=5)))))
+    evaluator = Evaluator(workbook, [(0, 0, 1)])
+    assert evaluator.depends_on_variables((0, 0, 0))
+    assert evaluator.depends_on_variables((0, 1, 0))
+    assert not evaluator.depends_on_variables((0, 2, 0))
+    assert evaluator.get_value((0, 2, 0)) == 5
+    with pytest.raises(WorkbookError):
+        evaluator.get_value((0, 0, 0))
+
+
+def test_solve_file_with_invalid_cell(tmp_path):
+    # Float cell without a value
+    path = write_ods(tmp_path / "invalid.ods",
+                     table("S", row('<table:table-cell office:value-type="float"/>')))
+    [result] = batch_solve.solve_file(path, OPTIONS)
+    assert result["status"].startswith("Error reading file")
+
+
+def test_solve_file_with_export_error(tmp_path):
+    pytest.importorskip("ortools")
+    path = write_ods(tmp_path / "plan.ods", production_sheet())
+    # The export folder cannot be created since a file has the same name
+    blocked = tmp_path / "export"
+    blocked.write_text("")
+    [result] = batch_solve.solve_file(path, dict(OPTIONS, export=str(blocked)))
+    assert result["export_error"].startswith("Error exporting the model")
+    assert result["result_value"] == pytest.approx(28)
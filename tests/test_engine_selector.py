@@ -0,0 +1,65 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "package", "src", "pythonpath"))
+import engine_selector
+import linear_model
+
+
+def all_available(engine):
+    return True
+
+
+def make_model(var_types, coeffs, rhs=1):
+    model = linear_model.LinearModel(range(len(var_types)))
+    model.var_types = list(var_types)
+    model.obj_coefficients = [1] * len(var_types)
+    model.add_constraint(linear_model.OP_LESS_EQUAL, coeffs, rhs)
+    return model
+
+
+def test_linear_model():
+    model = make_model(["float"] * 3, [1, 2, 3])
+    assert engine_selector.select_engine(model, available=all_available)[0] == "GLOP"
+
+
+def test_binary_model():
+    model = make_model(["binary", "binary", "integer"], [1, 2, 3], rhs=4)
+    assert engine_selector.select_engine(model, available=all_available)[0] == "CP-SAT"
+    # Fractional coefficients are not handled natively by CP-SAT
+    model = make_model(["binary", "binary", "integer"], [1, 2.5, 3])
+    assert engine_selector.select_engine(model, available=all_available)[0] == "CBC"
+
+
+def test_mixed_integer_model_size():
+    assert engine_selector.select_engine(make_model(["float", "integer"], [1, 1]),
+                                         available=all_available)[0] == "CBC"
+    model = make_model(["float", "integer"] * 200, [1] * 400)
+    assert engine_selector.select_engine(model, available=all_available)[0] == "SCIP"
+
+
+def test_non_finite_coefficients():
+    model = make_model(["binary", "binary"], [float("inf"), float("nan")])
+    stats = engine_selector.ModelStats(model)
+    assert not stats.integral_coefficients
+
+
+def test_unavailable_engines_are_skipped():
+    model = make_model(["float"] * 3, [1, 2, 3])
+    assert engine_selector.select_engine(model, available=lambda engine: engine != "GLOP")[0] == "CBC"
+
+
+def test_history(tmp_path):
+    path = str(tmp_path / "history.json")
+    model = make_model(["float"] * 3, [1, 2, 3])
+    fingerprint = engine_selector.fingerprint(model)
+    history = engine_selector.EngineHistory(path)
+    history.record(fingerprint, "GLOP", 5.0, True)
+    history.save()
+    # The fastest engine is slow, so an engine never tried is tested
+    history = engine_selector.EngineHistory(path)
+    assert engine_selector.select_engine(model, history, all_available)[0] == "CBC"
+    history.record(fingerprint, "CBC", 0.5, True)
+    engine, reason = engine_selector.select_engine(model, history, all_available)
+    assert engine == "CBC"
+    assert "fastest in history" in reason
@@ -0,0 +1,72 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "package", "src", "pythonpath"))
+import batch_solve
+import linear_model
+import replay
+
+pytest.importorskip("ortools")
+
+
+# Maximize x + y with x + 2y <= 4, x and y binary
+def export_model(path_base, relative_gap=0.05):
+    model = linear_model.LinearModel([(0, 0, 0), (0, 1, 0)], linear_model.VAR_BINARY)
+    model.obj_coefficients = [1, 1]
+    model.add_constraint(linear_model.OP_LESS_EQUAL, [1, 2], 4)
+    return linear_model.export_model(model, path_base, "SCIP", True, 10, relative_gap, "test")
+
+
+def test_replay_uses_exported_parameters(tmp_path):
+    export_model(str(tmp_path / "model"))
+    output = str(tmp_path / "replay.json")
+    replay.main([str(tmp_path / "model.pb"), str(tmp_path / "model.mps"), "-o", output])
+    with open(output) as f:
+        results = json.load(f)
+    assert [result["engine"] for result in results] == ["SCIP", "SCIP"]
+    assert all(result["relative_gap"] == 0.05 for result in results)
+    assert all(result["status"] == "OPTIMAL" and result["objective"] == pytest.approx(2) for result in results)
+
+
+def test_replay_threads(tmp_path):
+    export_model(str(tmp_path / "model"))
+    output = str(tmp_path / "replay.json")
+    replay.main([str(tmp_path / "model.pb"), "-e", "CBC", "SCIP", "-t", "1", "2",
+                 "--relative-gap", "0.1", "-o", output])
+    with open(output) as f:
+        results = {(r["engine"], r["threads"]): r for r in json.load(f)}
+    assert results[("CBC", 1)]["status"] == "OPTIMAL"
+    # CBC ignores the thread setting, so the run is not reported as a two thread run
+    assert results[("CBC", 2)]["status"] == "CBC only runs on a single thread"
+    assert results[("SCIP", 2)]["status"] == "OPTIMAL"
+    assert results[("SCIP", 2)]["relative_gap"] == 0.1
+
+
+def test_replay_integer_model_with_lp_engine(tmp_path):
+    export_model(str(tmp_path / "model"))
+    output = str(tmp_path / "replay.json")
+    replay.main([str(tmp_path / "model.pb"), "-e", "GLOP", "-o", output])
+    with open(output) as f:
+        [result] = json.load(f)
+    # GLOP would only solve the LP relaxation
+    assert result["status"] == "GLOP does not support integer variables"
+
+
+def test_unique_path_base(tmp_path):
+    path_base = str(tmp_path / "model")
+    assert linear_model.unique_path_base(path_base) == path_base
+    export_model(path_base)
+    assert linear_model.unique_path_base(path_base) == path_base + "_2"
+
+
+def test_export_names_are_unique():
+    names = {batch_solve.export_name("2023/plan.ods", ""),
+             batch_solve.export_name("2024/plan.ods", ""),
+             batch_solve.export_name("2024/plan.ods", "Sheet 2")}
+    assert len(names) == 3
+    assert all(name.startswith("plan_") for name in names)
+    assert batch_solve.export_name("2024/plan.ods", "Sheet 2").startswith("plan_Sheet_2_")
@@ -0,0 +1,965 @@
+###############################################
+# Headless batch solver
+# Reads the solver model stored in ODS files and solves them with OR-Tools
+# without a running LibreOffice instance
+#
+# Usage:
+#   python tools/batch_solve.py -o summary.csv -j 8 workbooks/*.ods
+###############################################
+
+import argparse
+import csv
+import decimal
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+# The linear model is shared with the solver component
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "package", "src", "pythonpath"))
+import linear_model
+import engine_selector
+
+NS_TABLE = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+NS_OFFICE = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+
+TAG_TABLE = "{%s}table" % NS_TABLE
+TAG_ROW = "{%s}table-row" % NS_TABLE
+TAG_CELL = "{%s}table-cell" % NS_TABLE
+TAG_COVERED_CELL = "{%s}covered-table-cell" % NS_TABLE
+TAG_NAMED_RANGE = "{%s}named-range" % NS_TABLE
+TAG_NAMED_EXPRESSION = "{%s}named-expression" % NS_TABLE
+
+ATTR_NAME = "{%s}name" % NS_TABLE
+ATTR_ROWS_REPEATED = "{%s}number-rows-repeated" % NS_TABLE
+ATTR_COLS_REPEATED = "{%s}number-columns-repeated" % NS_TABLE
+ATTR_FORMULA = "{%s}formula" % NS_TABLE
+ATTR_RANGE_ADDRESS = "{%s}cell-range-address" % NS_TABLE
+ATTR_EXPRESSION = "{%s}expression" % NS_TABLE
+ATTR_VALUE_TYPE = "{%s}value-type" % NS_OFFICE
+ATTR_VALUE = "{%s}value" % NS_OFFICE
+ATTR_BOOLEAN_VALUE = "{%s}boolean-value" % NS_OFFICE
+
+# Named ranges where LibreOffice stores the solver model
+SOLVER_OBJECTIVE = "solver_opt"
+SOLVER_OBJECTIVE_TYPE = "solver_typ"
+SOLVER_VARIABLES = "solver_adj"
+SOLVER_CONSTRAINT_COUNT = "solver_num"
+SOLVER_INTEGER = "solver_int"
+SOLVER_NON_NEGATIVE = "solver_neg"
+SOLVER_TIMEOUT = "solver_tim"
+
+# Objective types (solver_typ)
+OBJECTIVE_MAXIMIZE = 1
+OBJECTIVE_MINIMIZE = 2
+
+# Constraint operators (solver_relN)
+SOLVER_OPERATORS = {1: linear_model.OP_LESS_EQUAL,
+                    2: linear_model.OP_EQUAL,
+                    3: linear_model.OP_GREATER_EQUAL,
+                    4: linear_model.OP_INTEGER,
+                    5: linear_model.OP_BINARY}
+
+# Columns written to the CSV summary
+SUMMARY_FIELDS = ["file", "sheet", "success", "status", "result_value", "engine", "engine_reason",
+                  "variables", "constraints", "extract_seconds", "solve_seconds", "solution",
+                  "export_error"]
+
+
+# Raised when a workbook or one of its formulas cannot be handled
+class WorkbookError(Exception):
+    pass
+
+
+###############################################
+# Cell addresses
+###############################################
+
+RE_CELL = re.compile(r"^\$?([A-Za-z]+)\$?(\d+)$")
+
+
+# Converts a column name ("A", "AB") to a zero based index
+def column_index(name):
+    index = 0
+    for char in name.upper():
+        index = index * 26 + ord(char) - ord("A") + 1
+    return index - 1
+
+
+# Converts a zero based column index to its name
+def column_name(index):
+    name = ""
+    index += 1
+    while index > 0:
+        index, rem = divmod(index - 1, 26)
+        name = chr(ord("A") + rem) + name
+    return name
+
+
+# Splits "$'My Sheet'.$A$1" into (sheet name or None, "$A$1")
+def split_sheet(address):
+    address = address.strip()
+    if address.startswith("."):
+        return None, address[1:]
+    pos = address.rfind(".")
+    if pos < 0:
+        return None, address
+    sheet = address[:pos].lstrip("$")
+    if sheet.startswith("'") and sheet.endswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    return sheet, address[pos + 1:]
+
+
+# Splits a list of addresses separated by spaces or semicolons
+# Quoted sheet names may contain these separators
+RE_ADDRESS_ITEM = re.compile(r"(?:'(?:[^']|'')*'|[^\s;'])+")
+
+
+def split_addresses(text):
+    return [item.strip("[]") for item in RE_ADDRESS_ITEM.findall(text) if item.strip("[]")]
+
+
+###############################################
+# Workbook
+###############################################
+
+class Workbook:
+
+    def __init__(self):
+        self.sheet_names = list()
+        # Cells are stored as (Sheet, Row, Column) -> value
+        self.values = dict()
+        # Cells containing formulas (Sheet, Row, Column) -> formula text
+        self.formulas = dict()
+        # Named ranges and expressions stored as (scope, name) -> (kind, text)
+        # The scope is the sheet index for sheet local names and None for global names
+        self.names = dict()
+
+    # Returns a name as seen from a sheet (sheet local names hide global names)
+    def lookup_name(self, name, sheet):
+        if (sheet, name) in self.names:
+            return self.names[(sheet, name)]
+        return self.names.get((None, name))
+
+    def sheet_index(self, name, default=0):
+        if name is None:
+            return default
+        try:
+            return self.sheet_names.index(name)
+        except ValueError:
+            raise WorkbookError(f"Unknown sheet: {name}")
+
+    # Parses a single cell address into a tuple (Sheet, Row, Column)
+    def parse_cell(self, address, default_sheet=0):
+        sheet, cell = split_sheet(address)
+        match = RE_CELL.match(cell)
+        if match is None:
+            raise WorkbookError(f"Invalid cell address: {address}")
+        return (self.sheet_index(sheet, default_sheet), int(match.group(2)) - 1, column_index(match.group(1)))
+
+    # Parses "Sheet.A1" or "Sheet.A1:.B2" into the pair of corner tuples
+    def parse_range(self, address, default_sheet=0):
+        parts = address.split(":")
+        first = self.parse_cell(parts[0], default_sheet)
+        if len(parts) == 1:
+            return first, first
+        last = self.parse_cell(parts[1], first[0])
+        return first, last
+
+    # Returns the list of cells in a range, ordered by row and then by column
+    def range_cells(self, first, last):
+        return [(first[0], row, col)
+                for row in range(first[1], last[1] + 1)
+                for col in range(first[2], last[2] + 1)]
+
+
+# Reads the cells and named ranges of an ODS file
+# The content is parsed in a streaming way and rows are discarded as soon as they are read
+def read_workbook(path):
+    workbook = Workbook()
+    sheet = -1
+    row = 0
+    col = 0
+    row_cells = list()
+    depth = 0
+    with zipfile.ZipFile(path) as package:
+        with package.open("content.xml") as content:
+            for event, elem in ET.iterparse(content, events=("start", "end")):
+                tag = elem.tag
+                if event == "start":
+                    if tag == TAG_TABLE:
+                        depth += 1
+                        # Nested tables (e.g. inside shapes) are not part of the sheet grid
+                        if depth == 1:
+                            sheet += 1
+                            row = 0
+                            workbook.sheet_names.append(elem.get(ATTR_NAME))
+                    elif tag == TAG_ROW and depth == 1:
+                        col = 0
+                        row_cells = list()
+                    continue
+
+                if tag in (TAG_CELL, TAG_COVERED_CELL) and depth == 1:
+                    repeat = int(elem.get(ATTR_COLS_REPEATED, "1"))
+                    formula = elem.get(ATTR_FORMULA)
+                    value = cell_value(elem)
+                    if formula is not None or value is not None:
+                        for i in range(repeat):
+                            row_cells.append((col + i, value, formula))
+                    col += repeat
+                    elem.clear()
+                elif tag == TAG_ROW and depth == 1:
+                    repeat = int(elem.get(ATTR_ROWS_REPEATED, "1"))
+                    if row_cells:
+                        for i in range(repeat):
+                            for cell_col, value, formula in row_cells:
+                                key = (sheet, row + i, cell_col)
+                                if value is not None:
+                                    workbook.values[key] = value
+                                if formula is not None:
+                                    workbook.formulas[key] = formula
+                    row += repeat
+                    elem.clear()
+                elif tag in (TAG_NAMED_RANGE, TAG_NAMED_EXPRESSION):
+                    # Names declared inside a table are local to that sheet
+                    key = (sheet if depth == 1 else None, elem.get(ATTR_NAME))
+                    if tag == TAG_NAMED_RANGE:
+                        workbook.names[key] = ("range", elem.get(ATTR_RANGE_ADDRESS))
+                    else:
+                        workbook.names[key] = ("expression", elem.get(ATTR_EXPRESSION))
+                elif tag == TAG_TABLE:
+                    depth -= 1
+    return workbook
+
+
+# Returns the numeric value stored in a cell element (or None if not numeric)
+def cell_value(elem):
+    value_type = elem.get(ATTR_VALUE_TYPE)
+    if value_type in ("float", "percentage", "currency"):
+        return float(elem.get(ATTR_VALUE))
+    if value_type == "boolean":
+        return 1.0 if elem.get(ATTR_BOOLEAN_VALUE) == "true" else 0.0
+    return None
+
+
+###############################################
+# Formulas
+###############################################
+
+RE_TOKEN = re.compile(r"""
+    \s*(?:
+      (?P<ref>\[[^\]]*\])
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<string>"(?:[^"]|"")*")
+    | (?P<name>[A-Za-z_][A-Za-z0-9_.]*)
+    | (?P<op><>|<=|>=|[-+*/^&=<>%();])
+    )""", re.VERBOSE)
+
+# Binary operators and their precedence
+BINARY_OPERATORS = {"=": 1, "<>": 1, "<": 1, ">": 1, "<=": 1, ">=": 1,
+                    "&": 2, "+": 3, "-": 3, "*": 4, "/": 4, "^": 5}
+
+
+def tokenize(text):
+    tokens = list()
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = RE_TOKEN.match(text, pos)
+        if match is None:
+            raise WorkbookError(f"Unable to parse formula: {text}")
+        tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        pos = match.end()
+    return tokens
+
+
+# Recursive descent parser for OpenFormula expressions
+# Nodes are tuples whose first item is the node type
+class FormulaParser:
+
+    def __init__(self, workbook, sheet, text):
+        self.workbook = workbook
+        self.sheet = sheet
+        for prefix in ("of:=", "oooc:=", "msoxl:=", "="):
+            if text.startswith(prefix):
+                text = text[len(prefix):]
+                break
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return (None, None)
+
+    def next(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, value):
+        token = self.next()
+        if token[1] != value:
+            raise WorkbookError(f"Expected '{value}' in formula")
+
+    def parse(self):
+        node = self.parse_binary(1)
+        if self.pos != len(self.tokens):
+            raise WorkbookError("Unexpected token in formula: " + str(self.peek()[1]))
+        return node
+
+    def parse_binary(self, min_prec):
+        left = self.parse_unary()
+        while True:
+            kind, value = self.peek()
+            if kind != "op" or value not in BINARY_OPERATORS or BINARY_OPERATORS[value] < min_prec:
+                return left
+            self.next()
+            prec = BINARY_OPERATORS[value]
+            # Power is evaluated left to right in LibreOffice
+            right = self.parse_binary(prec + 1)
+            left = ("binop", value, left, right)
+
+    def parse_unary(self):
+        kind, value = self.peek()
+        if kind == "op" and value in ("-", "+"):
+            self.next()
+            operand = self.parse_unary()
+            if value == "-":
+                return ("neg", operand)
+            return operand
+        return self.parse_postfix()
+
+    def parse_postfix(self):
+        node = self.parse_primary()
+        while self.peek() == ("op", "%"):
+            self.next()
+            node = ("binop", "/", node, ("num", 100.0))
+        return node
+
+    def parse_primary(self):
+        kind, value = self.next()
+        if kind == "number":
+            return ("num", float(value))
+        if kind == "string":
+            return ("str", value[1:-1].replace('""', '"'))
+        if kind == "ref":
+            return self.parse_reference(value[1:-1])
+        if kind == "op" and value == "(":
+            node = self.parse_binary(1)
+            self.expect(")")
+            return node
+        if kind == "name":
+            if self.peek() == ("op", "("):
+                self.next()
+                args = list()
+                if self.peek() != ("op", ")"):
+                    while True:
+                        args.append(self.parse_binary(1))
+                        if self.peek() != ("op", ";"):
+                            break
+                        self.next()
+                self.expect(")")
+                return ("func", value.upper(), args)
+            if value.upper() in ("TRUE", "FALSE"):
+                return ("num", 1.0 if value.upper() == "TRUE" else 0.0)
+            return self.parse_name(value)
+        raise WorkbookError(f"Unexpected token in formula: {value}")
+
+    def parse_reference(self, text):
+        if "#REF!" in text:
+            raise WorkbookError("Invalid reference in formula")
+        first, last = self.workbook.parse_range(text, self.sheet)
+        if first == last:
+            return ("cell", first)
+        return ("range", first, last)
+
+    # Named ranges used inside formulas
+    def parse_name(self, name):
+        named = self.workbook.lookup_name(name, self.sheet)
+        if named is None:
+            raise WorkbookError(f"Unknown name in formula: {name}")
+        kind, text = named
+        if kind == "range":
+            first, last = self.workbook.parse_range(split_addresses(text)[0], self.sheet)
+            if first == last:
+                return ("cell", first)
+            return ("range", first, last)
+        return FormulaParser(self.workbook, self.sheet, text).parse()
+
+
+# Flattens function arguments into a list of numbers, as done by SUM and friends
+# Cells with text or no value are ignored
+def flatten(values):
+    result = list()
+    for value in values:
+        if isinstance(value, list):
+            result.extend(v for v in value if isinstance(v, float))
+        elif isinstance(value, float):
+            result.append(value)
+    return result
+
+
+# Checks that a function only received single values and returns them
+def scalar_args(args, name, min_count, max_count):
+    if not min_count <= len(args) <= max_count:
+        raise WorkbookError(f"Wrong number of arguments for {name}")
+    if any(isinstance(arg, list) for arg in args):
+        raise WorkbookError(f"{name} does not accept ranges")
+    return args
+
+
+# LibreOffice rounds halves away from zero (ROUND(2.5) = 3, ROUND(-2.5) = -3)
+def func_round(args):
+    args = scalar_args(args, "ROUND", 1, 2)
+    digits = int(args[1]) if len(args) > 1 else 0
+    value = decimal.Decimal(repr(abs(args[0])))
+    rounded = float(value.quantize(decimal.Decimal(1).scaleb(-digits), rounding=decimal.ROUND_HALF_UP))
+    return math.copysign(rounded, args[0])
+
+
+def func_sumproduct(args):
+    if not args or any(not isinstance(arg, list) or len(arg) != len(args[0]) for arg in args):
+        raise WorkbookError("SUMPRODUCT arguments must be ranges of the same size")
+    total = 0.0
+    for items in zip(*args):
+        product = 1.0
+        for item in items:
+            product *= item if isinstance(item, float) else 0.0
+        total += product
+    return total
+
+
+# Functions supported by the in-process evaluator
+# Each function receives the evaluated arguments (ranges are lists of values)
+FUNCTIONS = {
+    "SUM": lambda args: math.fsum(flatten(args)),
+    "SUMPRODUCT": func_sumproduct,
+    "PRODUCT": lambda args: math.prod(flatten(args)),
+    "MIN": lambda args: min(flatten(args), default=0.0),
+    "MAX": lambda args: max(flatten(args), default=0.0),
+    "AVERAGE": lambda args: math.fsum(flatten(args)) / len(flatten(args)),
+    "ABS": lambda args: abs(scalar_args(args, "ABS", 1, 1)[0]),
+    "ROUND": func_round,
+}
+
+
+# Evaluates the cells of a workbook in-process
+# Implements the cell source interface used by linear_model.extract_model
+class Evaluator:
+
+    def __init__(self, workbook, variables):
+        self.workbook = workbook
+        self.variables = {cell: 0.0 for cell in variables}
+        self.parsed = dict()
+        self.cache = dict()
+        self.depends = dict()
+
+    def get_tuple(self, cell):
+        return cell
+
+    def is_cell(self, value):
+        return isinstance(value, tuple)
+
+    def set_value(self, cell, value):
+        if self.variables.get(cell) != value:
+            self.variables[cell] = float(value)
+            self.cache.clear()
+
+    def get_value(self, cell):
+        value = self.cell_value(cell)
+        if isinstance(value, float):
+            return value
+        return 0.0
+
+    def formula(self, cell):
+        if cell not in self.parsed:
+            self.parsed[cell] = FormulaParser(self.workbook, cell[0], self.workbook.formulas[cell]).parse()
+        return self.parsed[cell]
+
+    # Returns True if the value of the cell changes when the variables change
+    # Only these cells need to be evaluated; all others keep the value stored in the file
+    def depends_on_variables(self, cell):
+        if cell in self.variables:
+            return True
+        if cell not in self.workbook.formulas:
+            return False
+        if cell in self.depends:
+            return self.depends[cell]
+
+        # Collect every formula cell reachable from this one with an explicit stack
+        # (chains such as running totals can be longer than the recursion limit)
+        edges = dict()
+        stack = [cell]
+        while stack:
+            current = stack.pop()
+            if current in edges:
+                continue
+            edges[current] = list(self.references(self.formula(current)))
+            for ref in edges[current]:
+                if ref in self.workbook.formulas and ref not in self.variables \
+                        and ref not in self.depends and ref not in edges:
+                    stack.append(ref)
+
+        # Propagate backwards from the cells that use a variable (or a cell already known to depend on one)
+        # This gives the exact result for every collected cell, including cells in circular references
+        users = dict()
+        depending = set()
+        for current, refs in edges.items():
+            for ref in refs:
+                users.setdefault(ref, list()).append(current)
+                if ref in self.variables or self.depends.get(ref, False):
+                    depending.add(current)
+        queue = list(depending)
+        while queue:
+            for user in users.get(queue.pop(), ()):
+                if user not in depending:
+                    depending.add(user)
+                    queue.append(user)
+        for current in edges:
+            self.depends[current] = current in depending
+        return self.depends[cell]
+
+    # Yields all cells referenced by a formula node
+    def references(self, node):
+        kind = node[0]
+        if kind == "cell":
+            yield node[1]
+        elif kind == "range":
+            yield from self.existing_cells(node[1], node[2])
+        elif kind == "binop":
+            yield from self.references(node[2])
+            yield from self.references(node[3])
+        elif kind == "neg":
+            yield from self.references(node[1])
+        elif kind == "func":
+            for arg in node[2]:
+                yield from self.references(arg)
+
+    # Cells of a range that hold a value, formula or variable
+    # Large ranges (e.g. whole columns) are intersected with the stored cells instead of being expanded
+    def existing_cells(self, first, last):
+        area = (last[1] - first[1] + 1) * (last[2] - first[2] + 1)
+        if area <= len(self.workbook.formulas) + len(self.workbook.values):
+            for cell in self.workbook.range_cells(first, last):
+                if cell in self.workbook.formulas or cell in self.workbook.values or cell in self.variables:
+                    yield cell
+        else:
+            stored = set(self.workbook.formulas) | set(self.workbook.values) | set(self.variables)
+            for cell in sorted(stored):
+                if cell[0] == first[0] and first[1] <= cell[1] <= last[1] and first[2] <= cell[2] <= last[2]:
+                    yield cell
+
+    def cell_value(self, cell):
+        if cell in self.variables:
+            return self.variables[cell]
+        if not self.depends_on_variables(cell):
+            return self.workbook.values.get(cell)
+        if cell not in self.cache:
+            self.evaluate_precedents(cell)
+        value = self.cache[cell]
+        if isinstance(value, WorkbookError):
+            raise value
+        return value
+
+    # Evaluates a cell after all the cells it depends on, using an explicit stack
+    # so that long dependency chains do not hit the recursion limit
+    # Errors are cached and only raised when the value is used (e.g. not in the unused branch of an IF)
+    def evaluate_precedents(self, cell):
+        stack = [(cell, False)]
+        # Cells whose precedents are being evaluated (the current dependency path)
+        pending = set()
+        while stack:
+            current, ready = stack.pop()
+            if ready:
+                pending.discard(current)
+                try:
+                    self.cache[current] = self.evaluate(self.formula(current))
+                except WorkbookError as e:
+                    self.cache[current] = e
+                continue
+            if current in self.cache:
+                continue
+            if current in pending:
+                raise WorkbookError("Circular reference in formulas")
+            pending.add(current)
+            stack.append((current, True))
+            for ref in self.references(self.formula(current)):
+                if ref not in self.variables and ref not in self.cache and self.depends_on_variables(ref):
+                    stack.append((ref, False))
+
+    def evaluate(self, node):
+        kind = node[0]
+        if kind == "num" or kind == "str":
+            return node[1]
+        if kind == "cell":
+            value = self.cell_value(node[1])
+            return 0.0 if value is None else value
+        if kind == "range":
+            return [self.cell_value(cell) for cell in self.workbook.range_cells(node[1], node[2])]
+        if kind == "neg":
+            return -self.number(self.evaluate(node[1]))
+        if kind == "binop":
+            return self.binop(node[1], self.evaluate(node[2]), self.evaluate(node[3]))
+        if kind == "func":
+            return self.function(node[1], node[2])
+        raise WorkbookError(f"Unsupported formula element: {kind}")
+
+    def number(self, value):
+        if isinstance(value, float):
+            return value
+        if isinstance(value, list) and len(value) == 1:
+            return self.number(value[0])
+        if value is None:
+            return 0.0
+        raise WorkbookError("Non numeric value used in formula")
+
+    def binop(self, op, left, right):
+        if op == "&":
+            return str(left) + str(right)
+        if op in ("=", "<>", "<", ">", "<=", ">="):
+            left, right = self.number(left), self.number(right)
+            result = {"=": left == right, "<>": left != right, "<": left < right,
+                      ">": left > right, "<=": left <= right, ">=": left >= right}[op]
+            return 1.0 if result else 0.0
+        left, right = self.number(left), self.number(right)
+        if op == "+":
+            return left + right
+        if op == "-":
+            return left - right
+        if op == "*":
+            return left * right
+        if op == "/":
+            if right == 0:
+                raise WorkbookError("Division by zero in formula")
+            return left / right
+        return left ** right
+
+    def function(self, name, arg_nodes):
+        # IF only evaluates the selected branch
+        if name == "IF":
+            condition = self.number(self.evaluate(arg_nodes[0]))
+            if condition != 0:
+                return self.evaluate(arg_nodes[1]) if len(arg_nodes) > 1 else 1.0
+            return self.evaluate(arg_nodes[2]) if len(arg_nodes) > 2 else 0.0
+        if name not in FUNCTIONS:
+            raise WorkbookError(f"Unsupported function: {name}")
+        args = list()
+        for node in arg_nodes:
+            value = self.evaluate(node)
+            if not isinstance(value, list):
+                value = self.number(value)
+            args.append(value)
+        return FUNCTIONS[name](args)
+
+
+###############################################
+# Solver model stored in the workbook
+###############################################
+
+# Solver settings read from the named ranges of the workbook
+class SolverSettings:
+
+    def __init__(self):
+        self.objective = None
+        self.maximize = True
+        self.variables = list()
+        # Each constraint is a tuple (left, operator, right)
+        self.constraints = list()
+        self.non_negative = None
+        self.integer = None
+        self.timeout = None
+
+
+# Returns the text of a named range/expression without the formula prefix
+# Solver settings are only read from the given scope, never from another sheet or the global names
+def named_text(workbook, name, scope):
+    if (scope, name) not in workbook.names:
+        return None
+    kind, text = workbook.names[(scope, name)]
+    if kind == "expression":
+        for prefix in ("of:=", "oooc:=", "="):
+            if text.startswith(prefix):
+                return text[len(prefix):]
+    return text
+
+
+# Returns the numeric value of a named expression (e.g. solver_typ = 1)
+def named_number(workbook, name, scope):
+    text = named_text(workbook, name, scope)
+    if text is None:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        raise WorkbookError(f"Invalid value for {name}: {text}")
+
+
+# Returns the list of cells of a named range (e.g. "$Sheet1.$B$2:.$B$5")
+# References written as formulas ("[$Sheet1.$B$2]") and lists of ranges are also accepted
+def named_cells(workbook, name, scope):
+    text = named_text(workbook, name, scope)
+    if text is None:
+        return None
+    default_sheet = 0 if scope is None else scope
+    cells = list()
+    for part in split_addresses(text):
+        cells.extend(workbook.range_cells(*workbook.parse_range(part, default_sheet)))
+    return cells
+
+
+# Returns the scopes holding a solver model: sheets with local settings first, then the global names
+def model_scopes(workbook):
+    scopes = [scope for scope, name in workbook.names if name == SOLVER_OBJECTIVE and scope is not None]
+    scopes.sort()
+    if (None, SOLVER_OBJECTIVE) in workbook.names:
+        scopes.append(None)
+    return scopes
+
+
+def read_solver_settings(workbook, scope):
+    settings = SolverSettings()
+    objective = named_cells(workbook, SOLVER_OBJECTIVE, scope)
+    variables = named_cells(workbook, SOLVER_VARIABLES, scope)
+    if not objective or not variables:
+        raise WorkbookError("No solver model stored in the file")
+    settings.objective = objective[0]
+    settings.variables = variables
+
+    objective_type = named_number(workbook, SOLVER_OBJECTIVE_TYPE, scope)
+    if objective_type is not None:
+        if objective_type == OBJECTIVE_MAXIMIZE:
+            settings.maximize = True
+        elif objective_type == OBJECTIVE_MINIMIZE:
+            settings.maximize = False
+        else:
+            raise WorkbookError("Error: only maximization and minimization are supported")
+
+    # Boolean options are stored as 1 (True) and 2 (False)
+    non_negative = named_number(workbook, SOLVER_NON_NEGATIVE, scope)
+    if non_negative is not None:
+        settings.non_negative = non_negative == 1
+    integer = named_number(workbook, SOLVER_INTEGER, scope)
+    if integer is not None:
+        settings.integer = integer == 1
+    settings.timeout = named_number(workbook, SOLVER_TIMEOUT, scope)
+
+    count = int(named_number(workbook, SOLVER_CONSTRAINT_COUNT, scope) or 0)
+    for i in range(1, count + 1):
+        left = named_cells(workbook, f"solver_lhs{i}", scope)
+        operator = named_number(workbook, f"solver_rel{i}", scope)
+        if not left or operator is None:
+            continue
+        if int(operator) not in SOLVER_OPERATORS:
+            raise WorkbookError("Error: unknown constraint type")
+        operator = SOLVER_OPERATORS[int(operator)]
+        # Integer and binary constraints may be applied to a whole range
+        if operator in (linear_model.OP_INTEGER, linear_model.OP_BINARY):
+            for cell in left:
+                settings.constraints.append((cell, operator, None))
+            continue
+        right = named_right_side(workbook, f"solver_rhs{i}", scope)
+        # A single right cell applies to every left cell, as in the Solver dialog
+        if isinstance(right, list) and len(right) == 1:
+            right = right[0]
+        if isinstance(right, list):
+            if len(right) != len(left):
+                raise WorkbookError(f"Constraint {i} has sides of different sizes")
+            settings.constraints.extend((l, operator, r) for l, r in zip(left, right))
+        else:
+            settings.constraints.extend((l, operator, right) for l in left)
+    return settings
+
+
+# The right side of a constraint is either a list of cells or a number
+def named_right_side(workbook, name, scope):
+    text = named_text(workbook, name, scope)
+    if text is None:
+        return 0.0
+    try:
+        return float(text)
+    except ValueError:
+        return named_cells(workbook, name, scope)
+
+
+###############################################
+# Batch solving
+###############################################
+
+# Returns a readable name for a (Sheet, Row, Column) tuple
+def cell_name(workbook, cell):
+    return f"{workbook.sheet_names[cell[0]]}.{column_name(cell[2])}{cell[1] + 1}"
+
+
+# Returns the base name of the exported files of a model
+# Workbooks with the same name in different folders (and the models of each sheet) get different names,
+# so parallel workers never write to the same files
+def export_name(path, sheet):
+    digest = hashlib.sha1(f"{os.path.abspath(path)}\0{sheet}".encode()).hexdigest()[:8]
+    name = os.path.splitext(os.path.basename(path))[0]
+    if sheet:
+        name += "_" + re.sub(r"[^\w.-]", "_", sheet)
+    return f"{name}_{digest}"
+
+
+# Solves all models stored in a file (or only the one of options["sheet"]); runs in a worker process
+# Returns one result per model
+def solve_file(path, options):
+    try:
+        workbook = read_workbook(path)
+        scopes = model_scopes(workbook)
+        if options["sheet"]:
+            scopes = [workbook.sheet_index(options["sheet"])]
+        if not scopes:
+            raise WorkbookError("No solver model stored in the file")
+    except WorkbookError as e:
+        return [new_result(path, "", options, str(e))]
+    except (OSError, zipfile.BadZipFile, ET.ParseError, KeyError) as e:
+        return [new_result(path, "", options, f"Error reading file: {e}")]
+    except Exception as e:
+        # A single broken workbook must not stop the whole batch
+        return [new_result(path, "", options, f"Error reading file: {e}")]
+    return [solve_scope(path, workbook, scope, options) for scope in scopes]
+
+
+def new_result(path, sheet, options, status=""):
+    return {"file": path, "sheet": sheet, "success": False, "status": status, "result_value": 0,
+            "engine": options["engine"], "engine_reason": "", "variables": 0, "constraints": 0,
+            "extract_seconds": 0.0, "solve_seconds": 0.0, "solution": {}, "export_error": ""}
+
+
+# Solves the model stored in a scope (sheet index, or None for the global names)
+def solve_scope(path, workbook, scope, options):
+    sheet = "" if scope is None else workbook.sheet_names[scope]
+    result = new_result(path, sheet, options)
+    try:
+        t_ini = time.time()
+        settings = read_solver_settings(workbook, scope)
+        # Settings stored in the file take precedence over the command line defaults
+        non_negative = options["non_negative"] if settings.non_negative is None else settings.non_negative
+        integer = options["integer"] if settings.integer is None else settings.integer
+        timeout = options["timeout"] if settings.timeout is None else settings.timeout
+        evaluator = Evaluator(workbook, settings.variables)
+        model = linear_model.extract_model(evaluator, settings.objective, settings.variables,
+                                           settings.constraints, integer, settings.maximize)
+        t_end = time.time()
+        result["extract_seconds"] = t_end - t_ini
+        result["variables"] = len(model.var_names)
+        result["constraints"] = len(model.constraints)
+
+        # The history is only read here; it is updated by the main process
+        engine = options["engine"]
+        if engine == engine_selector.ENGINE_AUTO:
+            history = None
+            if options["history"]:
+                history = engine_selector.EngineHistory(options["history"])
+            engine, result["engine_reason"] = engine_selector.select_engine(model, history)
+            result["fingerprint"] = engine_selector.fingerprint(model)
+        result["engine"] = engine
+
+        # Export errors are reported separately and do not prevent the model from being solved
+        if options["export"]:
+            try:
+                os.makedirs(options["export"], exist_ok=True)
+                name = export_name(path, sheet)
+                linear_model.export_model(model, os.path.join(options["export"], name), engine,
+                                          non_negative, timeout, options["relative_gap"], name)
+            except Exception as e:
+                result["export_error"] = f"Error exporting the model: {e}"
+
+        t_ini = time.time()
+        solved = linear_model.solve_model(model, engine, non_negative, timeout,
+                                          options["relative_gap"], verbose=False)
+        result["solve_seconds"] = time.time() - t_ini
+        result["success"] = solved.success
+        result["status"] = solved.status_description
+        result["result_value"] = solved.result_value
+        result["solution"] = {cell_name(workbook, cell): value
+                              for cell, value in zip(model.var_names, solved.solution)}
+    except (WorkbookError, linear_model.ModelError) as e:
+        result["status"] = str(e)
+    except Exception as e:
+        # A single broken model must not stop the whole batch
+        result["status"] = f"Error: {e}"
+    return result
+
+
+def write_summary(results, output):
+    if output.lower().endswith(".json"):
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        return
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for result in results:
+            row = dict(result)
+            row["solution"] = ";".join(f"{cell}={value}" for cell, value in result["solution"].items())
+            writer.writerow(row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve the solver models stored in ODS files with OR-Tools")
+    parser.add_argument("files", nargs="+", help="ODS files to solve")
+    parser.add_argument("-o", "--output", default="summary.csv",
+                        help="Summary file; written as JSON if the name ends with .json, otherwise as CSV")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("-s", "--sheet", default="",
+                        help="Only solve the model stored in this sheet (by default all stored models are solved)")
+    parser.add_argument("-e", "--engine", default="GLOP", help="Solver engine (Auto, CBC, CP-SAT, GLOP, SCIP)")
+    parser.add_argument("--history", default="",
+                        help="Engine history file used and updated by the Auto engine")
+    parser.add_argument("--export", default="",
+                        help="Folder where the models are exported as MPS and proto files for tools/replay.py")
+    parser.add_argument("--timeout", type=int, default=100,
+                        help="Solving time limit in seconds, if not stored in the file")
+    parser.add_argument("--relative-gap", type=float, default=0.01, help="Relative gap for optimality")
+    parser.add_argument("--allow-negative", action="store_true",
+                        help="Do not assume variables as non-negative, if not stored in the file")
+    parser.add_argument("--integer", action="store_true",
+                        help="Assume variables as integer, if not stored in the file")
+    args = parser.parse_args(argv)
+
+    options = {"engine": args.engine,
+               "timeout": args.timeout,
+               "relative_gap": args.relative_gap,
+               "non_negative": not args.allow_negative,
+               "integer": args.integer,
+               "history": args.history,
+               "export": args.export,
+               "sheet": args.sheet}
+
+    t_ini = time.time()
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [executor.submit(solve_file, path, options) for path in args.files]
+        results = list()
+        for path, future in zip(args.files, futures):
+            # A crashed worker (e.g. a segmentation fault in the engine) only fails its own file
+            try:
+                file_results = future.result()
+            except Exception as e:
+                file_results = [new_result(path, "", options, f"Error: worker failed: {e!r}")]
+            for result in file_results:
+                sheet = f" [{result['sheet']}]" if result["sheet"] else ""
+                print(f"{result['file']}{sheet}: {result['status']}")
+                results.append(result)
+    if args.engine == engine_selector.ENGINE_AUTO and args.history:
+        history = engine_selector.EngineHistory(args.history)
+        for result in results:
+            if "fingerprint" in result:
+                history.record(result["fingerprint"], result["engine"], result["solve_seconds"], result["success"])
+        history.save()
+    write_summary(results, args.output)
+    solved = sum(1 for result in results if result["success"])
+    print(f"Solved {solved} of {len(results)} models in {time.time() - t_ini:.2f} seconds")
+    return 0 if solved == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+###############################################
+# Replay benchmark
+# Solves models exported by the extension (MPS or binary MPModelProto files)
+# with several engines and thread counts, without a running LibreOffice instance
+#
+# Usage:
+#   python tools/replay.py -e GLOP SCIP -t 1 4 -o timings.csv corpus/*.pb
+###############################################
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+# Engine used when none is given and the parameters file does not name one
+DEFAULT_ENGINE = "GLOP"
+
+# Engines that always run on a single thread
+# (GLOP and CLP reject the thread setting, CBC accepts it but ignores it)
+SINGLE_THREAD_ENGINES = ["GLOP", "CLP", "CBC"]
+
+# Engines that only solve linear programs (integer variables would be relaxed)
+LP_ONLY_ENGINES = ["GLOP", "CLP", "PDLP"]
+
+# Columns written to the CSV summary
+SUMMARY_FIELDS = ["file", "engine", "threads", "relative_gap", "run", "status", "objective", "seconds"]
+
+
+# Raised when a model file cannot be loaded
+class ReplayError(Exception):
+    pass
+
+
+# Reads the engine parameters written beside the model (see linear_model.export_model)
+def load_parameters(path):
+    params_path = os.path.splitext(path)[0] + ".json"
+    try:
+        with open(params_path) as f:
+            return json.load(f)
+    except OSError:
+        return dict()
+
+
+# Loads an MPS or binary MPModelProto file into an MPModelProto
+def load_model(path):
+    from ortools.linear_solver import linear_solver_pb2
+    from ortools.linear_solver.python import model_builder
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".mps":
+        builder = model_builder.Model()
+        if not builder.import_from_mps_file(path):
+            raise ReplayError(f"Unable to read MPS file: {path}")
+        return builder.export_to_proto()
+    if extension == ".pb":
+        proto = linear_solver_pb2.MPModelProto()
+        with open(path, "rb") as f:
+            proto.ParseFromString(f.read())
+        return proto
+    raise ReplayError(f"Unknown model format: {path}")
+
+
+# Solves the model once and returns the status name, objective value and solve time
+def run_model(proto, engine, threads, timeout, relative_gap):
+    from ortools.linear_solver import pywraplp
+
+    status_names = {pywraplp.Solver.OPTIMAL: "OPTIMAL",
+                    pywraplp.Solver.FEASIBLE: "FEASIBLE",
+                    pywraplp.Solver.INFEASIBLE: "INFEASIBLE",
+                    pywraplp.Solver.UNBOUNDED: "UNBOUNDED",
+                    pywraplp.Solver.ABNORMAL: "ABNORMAL",
+                    pywraplp.Solver.NOT_SOLVED: "NOT_SOLVED"}
+
+    solver = pywraplp.Solver.CreateSolver(engine)
+    if solver is None:
+        raise ReplayError(f"Unable to instantiate the solver engine: {engine}")
+    error = solver.LoadModelFromProto(proto)
+    if error != "":
+        raise ReplayError(f"Unable to load the model: {error}")
+    # The LP relaxation of an integer model would be timed as if it were the model itself
+    if engine in LP_ONLY_ENGINES and any(var.is_integer for var in proto.variable):
+        raise ReplayError(f"{engine} does not support integer variables")
+    # Thread counts an engine would silently ignore are reported as errors instead of being timed
+    if engine in SINGLE_THREAD_ENGINES:
+        if threads != 1:
+            raise ReplayError(f"{engine} only runs on a single thread")
+    elif not solver.SetNumThreads(threads):
+        raise ReplayError(f"{engine} does not support {threads} threads")
+
+    # Same parameters as set by linear_model.build_solver
+    solver_params = pywraplp.MPSolverParameters()
+    solver_params.SetDoubleParam(solver_params.RELATIVE_MIP_GAP, relative_gap)
+    solver.SetTimeLimit(int(timeout * 1000))
+
+    t_ini = time.time()
+    status = solver.Solve(solver_params)
+    seconds = time.time() - t_ini
+    objective = 0
+    if status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+        objective = solver.Objective().Value()
+    return status_names.get(status, str(status)), objective, seconds
+
+
+def write_summary(results, output):
+    if output.lower().endswith(".json"):
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        return
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time exported models across solver engines and thread counts")
+    parser.add_argument("files", nargs="+", help="Model files (.mps or .pb)")
+    parser.add_argument("-o", "--output", default="replay.csv",
+                        help="Summary file; written as JSON if the name ends with .json, otherwise as CSV")
+    parser.add_argument("-e", "--engines", nargs="+",
+                        help="Solver engines to compare (defaults to the engine used when the model was exported)")
+    parser.add_argument("-t", "--threads", nargs="+", type=int, default=[1], help="Thread counts to compare")
+    parser.add_argument("-r", "--repeat", type=int, default=1, help="Number of runs per engine and thread count")
+    parser.add_argument("--timeout", type=int,
+                        help="Solving time limit in seconds (defaults to the exported value)")
+    parser.add_argument("--relative-gap", type=float,
+                        help="Relative gap for optimality (defaults to the exported value)")
+    args = parser.parse_args(argv)
+
+    # Runs are made one at a time so that they do not compete for the CPU
+    results = list()
+    for path in args.files:
+        params = load_parameters(path)
+        engines = args.engines or [params.get("engine", DEFAULT_ENGINE)]
+        timeout = args.timeout if args.timeout is not None else params.get("timeout", 100)
+        relative_gap = args.relative_gap if args.relative_gap is not None else params.get("relative_gap", 0.01)
+        try:
+            proto = load_model(path)
+        except (ReplayError, OSError) as e:
+            print(f"{path}: {e}")
+            results.append({"file": path, "status": str(e)})
+            continue
+        for engine in engines:
+            for threads in args.threads:
+                for run in range(1, args.repeat + 1):
+                    result = {"file": path, "engine": engine, "threads": threads,
+                              "relative_gap": relative_gap, "run": run}
+                    try:
+                        status, objective, seconds = run_model(proto, engine, threads, timeout, relative_gap)
+                        result.update(status=status, objective=objective, seconds=seconds)
+                    except ReplayError as e:
+                        result["status"] = str(e)
+                    print(f"{path} [{engine}, {threads} threads, run {run}]: "
+                          f"{result['status']} {result.get('seconds', 0):.3f} s")
+                    results.append(result)
+    write_summary(results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())